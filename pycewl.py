@@ -6,20 +6,165 @@ Written with Claude
 """
 
 import argparse
+import codecs
+import html
+import os
 import re
 import sys
+import threading
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from functools import lru_cache
+from itertools import chain
+from operator import itemgetter
 from urllib.parse import urljoin, urlparse
-from collections import Counter
+from collections import Counter, deque
 import requests
-from bs4 import BeautifulSoup
-from typing import Set, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html as lxml_html
+from typing import Callable, Iterator, Optional, Set, List, Tuple
+
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+
+
+# Unicode characters for letters only (including accents)
+_WORD_RE = re.compile(r'\b[a-zA-ZÀ-ÿ]+\b')
+# Unicode characters for letters (including accents) + digits
+_WORD_NUM_RE = re.compile(r'\b[\w\u00C0-\u024F]+\b', re.UNICODE)
+_EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b')
+
+# Links whose path ends like this are never HTML, so they are not requested
+_SKIP_EXT_RE = re.compile(r'\.(?:jpe?g|png|gif|svg|webp|ico|bmp|pdf|zip|tar|gz|tgz|7z|rar'
+                          r'|mp3|mp4|avi|mov|css|js|woff2?|ttf|eot)$', re.I)
+
+# Pages are cut at this size to bound memory and parsing time
+MAX_PAGE_SIZE = 5 * 1024 * 1024
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml')
+_CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+
+
+# Used by --fast-parse, which skips building a DOM
+# (the lookbehind keeps data-href= and the like from matching, fragments
+# are stripped later like those found by lxml)
+_HREF_RE = re.compile(rb'<a\b[^>]*?(?<![\w-])href\s*=\s*'
+                      rb'(?:"([^"]*)"|\'([^\']*)\'|([^\s>"\']+))', re.I)
+_META_RE = re.compile(rb'<meta\b[^>]*?(?<![\w-])content\s*=\s*'
+                      rb'(?:"([^"]*)"|\'([^\']*)\'|([^\s>"\']+))', re.I)
+_TAG_RE = re.compile(rb'<(script|style)\b.*?</\1\s*>|<!--.*?-->|<[^>]+>', re.I | re.S)
+
+
+def _parse_html(content: bytes, charset: Optional[str]) -> Tuple[str, List[str], List[str]]:
+    """Parse a page with lxml, return its text, meta contents and links"""
+    if charset is None:
+        try:
+            # The page may end inside a character if it was truncated
+            codecs.getincrementaldecoder('utf-8')().decode(content)
+            charset = 'utf-8'
+        except UnicodeDecodeError:
+            # Let lxml look for a <meta> charset
+            pass
+    
+    try:
+        parser = lxml_html.HTMLParser(encoding=charset)
+    except LookupError:
+        parser = None
+    
+    try:
+        doc = lxml_html.fromstring(content, parser=parser)
+    except etree.ParserError:
+        # Empty document
+        return '', [], []
+    
+    # Blank out scripts and styles (dropping them would glue the
+    # surrounding text together)
+    for element in doc.iter('script', 'style'):
+        element.text = None
+    
+    text = ' '.join(doc.itertext())
+    metas = [tag.get('content', '') for tag in doc.iter('meta')]
+    hrefs = [link.get('href') for link in doc.iter('a')
+             if link.get('href') is not None]
+    return text, metas, hrefs
+
+
+def _decode(data: bytes, charset: Optional[str]) -> str:
+    """Decode a chunk of raw HTML and unescape its entities"""
+    try:
+        return html.unescape(data.decode(charset or 'utf-8', 'replace'))
+    except LookupError:
+        return html.unescape(data.decode('utf-8', 'replace'))
+
+
+def _scan_html(content: bytes, charset: Optional[str]) -> Tuple[str, List[str], List[str]]:
+    """Extract the same as _parse_html with regexes, for simple pages"""
+    text = _decode(_TAG_RE.sub(b' ', content), charset)
+    # Only one of the quoted/unquoted alternatives matched, join them
+    metas = [_decode(b''.join(meta), charset) for meta in _META_RE.findall(content)]
+    hrefs = [_decode(b''.join(href), charset) for href in _HREF_RE.findall(content)]
+    return text, metas, hrefs
+
+
+@lru_cache(maxsize=None)
+def _make_extractor(with_numbers: bool, min_len: int,
+                    max_len: Optional[int]) -> Callable[[str], Iterator[str]]:
+    """Build a word extractor with the options bound as locals"""
+    findall = (_WORD_NUM_RE if with_numbers else _WORD_RE).findall
+    if max_len is None:
+        max_len = sys.maxsize
+    
+    def extract(text: str) -> Iterator[str]:
+        # Normalize to lowercase (case insensitive) in one pass over the
+        # whole text rather than once per word, then filter by length.
+        # Only safe for ASCII: some letters ('İ', 'Ÿ', Kelvin sign) change
+        # length or word class when lowercased
+        if text.isascii():
+            return (word for word in findall(text.lower())
+                    if min_len <= len(word) <= max_len)
+        return map(str.lower, (word for word in findall(text)
+                               if min_len <= len(word) <= max_len))
+    
+    return extract
+
+
+def parse_page(content: bytes, charset: Optional[str], fast_parse: bool,
+               with_numbers: bool, min_word_length: int,
+               max_word_length: Optional[int], meta: bool,
+               emails: bool, words: bool = True) -> Tuple[Counter, List[str], List[str]]:
+    """Count the words of a page, return them with its emails and links
+
+    Only depends on its arguments, so that it can run in a worker process.
+    """
+    extract = _make_extractor(with_numbers, min_word_length, max_word_length)
+    
+    # Extract text, metadata and links
+    text, metas, hrefs = (_scan_html if fast_parse else _parse_html)(content, charset)
+    
+    # Count words (already lowercase for case insensitivity), metadata
+    # included if requested: one Counter fed in a single pass per page
+    if not words:
+        found_words = Counter()
+    elif meta and metas:
+        found_words = Counter(chain(extract(text), extract(' '.join(metas))))
+    else:
+        found_words = Counter(extract(text))
+    
+    # Extract emails if requested
+    found_emails = _EMAIL_RE.findall(text) if emails else []
+    
+    return found_words, found_emails, hrefs
 
 
 class PyCeWL:
     def __init__(self, url: str, depth: int = 2, min_word_length: int = 3, 
                  max_word_length: int = None, lowercase: bool = False,
                  with_numbers: bool = False, email_file: str = None,
-                 meta: bool = True, auth: tuple = None, user_agent: str = None):
+                 meta: bool = True, auth: tuple = None, user_agent: str = None,
+                 threads: int = 10, fast_parse: bool = False,
+                 processes: int = 0, email_only: bool = False):
         self.start_url = url
         self.depth = depth
         self.min_word_length = min_word_length
@@ -29,117 +174,190 @@ class PyCeWL:
         self.email_file = email_file
         self.meta = meta
         self.auth = auth
+        self.threads = threads
+        self.fast_parse = fast_parse
+        self.processes = processes
+        self.email_only = email_only
+        parsed_start = urlparse(url)
+        self._start_netloc = parsed_start.netloc
+        self._start_prefix = f'{parsed_start.scheme}://{parsed_start.netloc}/'
+        self._extract = _make_extractor(with_numbers, min_word_length, max_word_length)
+        # Pages are parsed the same way in --email-only mode, so the same
+        # emails are found and the same links followed, only words are skipped
+        self._parse_options = (fast_parse, with_numbers, min_word_length,
+                               max_word_length, meta, bool(email_file),
+                               not email_only)
+        self._pool = None
         
-        self.visited_urls: Set[str] = set()
+        # A Bloom filter takes a few bits per URL instead of the whole string,
+        # at the cost of rarely skipping a page it has not seen
+        if ScalableBloomFilter is not None:
+            self._seen = ScalableBloomFilter(initial_capacity=10000, error_rate=0.001)
+        else:
+            self._seen = set()
         self.words: Counter = Counter()
         self.emails: Set[str] = set()
+        self._lock = threading.Lock()
         
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': user_agent or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         
+        # One kept-alive connection per worker, retrying transient failures.
+        # Retry-After is ignored (it may ask for hours) and read timeouts
+        # are not retried, so a hung page costs a single timeout
+        adapter = HTTPAdapter(
+            pool_connections=threads, pool_maxsize=threads,
+            max_retries=Retry(total=2, read=False, backoff_factor=0.3,
+                              status_forcelist=[429, 500, 502, 503, 504],
+                              respect_retry_after_header=False)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         if auth:
             self.session.auth = auth
     
     def is_valid_url(self, url: str) -> bool:
         """Check if the URL belongs to the same domain"""
-        parsed_start = urlparse(self.start_url)
-        parsed_url = urlparse(url)
-        return parsed_start.netloc == parsed_url.netloc
-    
-    def extract_words(self, text: str) -> List[str]:
-        """Extract words from text (including accented characters)"""
-        if self.with_numbers:
-            # Unicode characters for letters (including accents) + digits
-            pattern = r'\b[\w\u00C0-\u024F]+\b'
-        else:
-            # Unicode characters for letters only (including accents)
-            pattern = r'\b[a-zA-ZÀ-ÿ]+\b'
-        
-        words = re.findall(pattern, text, re.UNICODE)
-        
-        # Filter by length and normalize to lowercase (case insensitive)
-        filtered_words = []
-        for word in words:
-            word_len = len(word)
-            if word_len >= self.min_word_length:
-                if self.max_word_length is None or word_len <= self.max_word_length:
-                    # Always normalize to lowercase
-                    filtered_words.append(word.lower())
-        
-        return filtered_words
+        # Most links share the start URL's scheme, no need to parse those
+        return (url.startswith(self._start_prefix)
+                or urlparse(url).netloc == self._start_netloc)
+    
+    def extract_words(self, text: str) -> Iterator[str]:
+        """Yield words from text (including accented characters)"""
+        return self._extract(text)
     
     def extract_emails(self, text: str) -> List[str]:
         """Extract email addresses from text"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        return re.findall(email_pattern, text)
+        return _EMAIL_RE.findall(text)
     
-    def crawl(self, url: str, current_depth: int = 0):
-        """Recursively crawl a website"""
-        if current_depth > self.depth or url in self.visited_urls:
-            return
-        
-        if not self.is_valid_url(url):
-            return
-        
-        self.visited_urls.add(url)
-        
-        try:
-            print(f"[*] Crawling: {url} (depth: {current_depth})", file=sys.stderr)
-            response = self.session.get(url, timeout=10, allow_redirects=True)
+    def fetch(self, url: str) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Download an HTML page (up to MAX_PAGE_SIZE bytes) and its charset"""
+        with self.session.get(url, timeout=10, allow_redirects=True,
+                              stream=True) as response:
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Skip images, archives and other non-HTML resources unread
+            content_type = response.headers.get('Content-Type', '')
+            # Media types are case-insensitive (some servers send Text/HTML)
+            if content_type and not content_type.lower().startswith(HTML_CONTENT_TYPES):
+                return None
             
-            # Remove scripts and styles
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract text
-            text = soup.get_text()
+            match = _CHARSET_RE.search(content_type)
+            charset = match.group(1) if match else None
+            content = response.raw.read(MAX_PAGE_SIZE, decode_content=True)
+            if len(content) == MAX_PAGE_SIZE:
+                # The page was cut: drop its last token, which may be partial
+                cut = max(content.rfind(sep) for sep in (b'<', b' ', b'\t', b'\n', b'\r'))
+                if cut > 0:
+                    content = content[:cut]
+            return content, charset
+    
+    def crawl_page(self, url: str, current_depth: int) -> Set[str]:
+        """Fetch and parse a single page, return the links found on it"""
+        links = set()
+        try:
+            print(f"[*] Crawling: {url} (depth: {current_depth})", file=sys.stderr)
+            page = self.fetch(url)
+            if page is None:
+                return links
             
-            # Extract words (already lowercase for case insensitivity)
-            words = self.extract_words(text)
-            self.words.update(words)
+            # Parsing is CPU-bound, hand it to the process pool if there is one
+            if self._pool is not None:
+                future = self._pool.submit(parse_page, *page, *self._parse_options)
+                words, emails, hrefs = future.result()
+            else:
+                words, emails, hrefs = parse_page(*page, *self._parse_options)
             
-            # Extract emails if requested
-            if self.email_file:
-                emails = self.extract_emails(text)
+            # Several pages are parsed at once, merge results under the lock
+            with self._lock:
+                self.words.update(words)
                 self.emails.update(emails)
             
-            # Extract metadata if requested
-            if self.meta:
-                meta_tags = soup.find_all('meta')
-                for tag in meta_tags:
-                    content = tag.get('content', '')
-                    if content:
-                        words = self.extract_words(content)
-                        self.words.update(words)
-            
-            # Extract links and continue crawling
+            # Extract links for the next level, once per distinct URL
+            # (anchors are cleaned so page#a and page#b count as one)
             if current_depth < self.depth:
-                for link in soup.find_all('a', href=True):
-                    next_url = urljoin(url, link['href'])
-                    # Clean anchors and query parameters if needed
-                    next_url = next_url.split('#')[0]
-                    self.crawl(next_url, current_depth + 1)
+                links = {urljoin(url, href).split('#')[0] for href in hrefs}
         
         except requests.RequestException as e:
             print(f"[!] Error crawling {url}: {e}", file=sys.stderr)
         except Exception as e:
             print(f"[!] Unexpected error: {e}", file=sys.stderr)
+        
+        return links
+    
+    def crawl(self):
+        """Crawl the website breadth-first, fetching pages concurrently"""
+        # URLs are marked as seen when queued, so none is queued twice
+        queue = deque([(self.start_url, 0)])
+        self._seen.add(self.start_url)
+        pending = {}
+        
+        # Not a with block: on Ctrl-C, its shutdown would wait for every
+        # in-flight fetch, possibly a whole timeout
+        executor = ThreadPoolExecutor(max_workers=self.threads)
+        try:
+            while queue or pending:
+                # Keep every worker busy, without waiting for a whole level
+                while queue and len(pending) < self.threads:
+                    url, current_depth = queue.popleft()
+                    future = executor.submit(self.crawl_page, url, current_depth)
+                    pending[future] = current_depth
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    next_depth = pending.pop(future) + 1
+                    for next_url in future.result():
+                        # Only the path: hosts and query strings may contain
+                        # extensions too (example.zip, view.php?file=a.pdf)
+                        if _SKIP_EXT_RE.search(urlparse(next_url).path):
+                            continue
+                        if next_url not in self._seen and self.is_valid_url(next_url):
+                            self._seen.add(next_url)
+                            queue.append((next_url, next_depth))
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
     
     def run(self):
         """Start crawling and return results"""
         print(f"[*] Starting crawl of {self.start_url}", file=sys.stderr)
         print(f"[*] Depth: {self.depth}", file=sys.stderr)
-        self.crawl(self.start_url)
-        print(f"\n[*] Crawling complete. URLs visited: {len(self.visited_urls)}", file=sys.stderr)
+        print(f"[*] Threads: {self.threads}", file=sys.stderr)
+        if self.processes:
+            print(f"[*] Parsing processes: {self.processes}", file=sys.stderr)
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            try:
+                self.crawl()
+            except KeyboardInterrupt:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            self._pool.shutdown()
+            self._pool = None
+        else:
+            self.crawl()
+        print(f"\n[*] Crawling complete. URLs visited: {len(self._seen)}", file=sys.stderr)
         print(f"[*] Unique words found: {len(self.words)}", file=sys.stderr)
         return self.words, self.emails
 
 
+def _int_at_least(minimum: int) -> Callable[[str], int]:
+    """Build an argparse type for integers no smaller than minimum"""
+    def parse(value: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, got {number}")
+        return number
+    
+    return parse
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='PyCeWL - Custom Word List Generator',
@@ -177,6 +395,13 @@ Usage examples:
                         help='HTTP Basic authentication (format: user:pass)')
     parser.add_argument('-u', '--user-agent', metavar='AGENT',
                         help='Custom User-Agent')
+    parser.add_argument('-t', '--threads', type=_int_at_least(1), default=10,
+                        help='Number of pages fetched concurrently (default: 10)')
+    parser.add_argument('-p', '--processes', type=_int_at_least(0), default=0, metavar='N',
+                        help='Parse pages in N worker processes (default: 0, '
+                             'parse in the fetching threads)')
+    parser.add_argument('--fast-parse', action='store_true',
+                        help='Extract text and links with regexes instead of an HTML parser')
     
     args = parser.parse_args()
     
@@ -201,7 +426,11 @@ Usage examples:
         email_file=args.email,
         meta=not args.no_meta,
         auth=auth,
-        user_agent=args.user_agent
+        user_agent=args.user_agent,
+        threads=args.threads,
+        fast_parse=args.fast_parse,
+        processes=args.processes,
+        email_only=args.email_only
     )
     
     # Start crawling
@@ -219,32 +448,30 @@ Usage examples:
         if args.email_only:
             sys.exit(0)
         
-        # Sort words by occurrence (most frequent first)
+        # Sort by decreasing frequency, then alphabetically for ties: two
+        # stable sorts on C-level keys instead of a Python key function
+        sorted_words = sorted(words.items(), key=itemgetter(0))
+        sorted_words.sort(key=itemgetter(1), reverse=True)
+        
+        # Output, streamed line by line rather than joined in memory
         if args.count:
-            sorted_words = words.most_common()
+            lines = (f"{word}, {count}\n" for word, count in sorted_words)
         else:
-            # Sort by decreasing frequency, then alphabetically for ties
-            sorted_words = sorted(words.items(), key=lambda x: (-x[1], x[0]))
-        
-        # Output
-        output_lines = []
-        for word, count in sorted_words:
-            if args.count:
-                output_lines.append(f"{word}, {count}")
-            else:
-                output_lines.append(word)
+            lines = (f"{word}\n" for word, _ in sorted_words)
         
         # Write to file or stdout
         if args.write:
-            with open(args.write, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(output_lines) + '\n')
+            with open(args.write, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                f.writelines(lines)
             print(f"[*] {len(words)} words saved to {args.write}", file=sys.stderr)
         else:
-            print('\n'.join(output_lines))
+            sys.stdout.writelines(lines)
     
     except KeyboardInterrupt:
         print("\n[!] Interrupted by user", file=sys.stderr)
-        sys.exit(1)
+        sys.stderr.flush()
+        # Exit without joining the fetch threads still waiting on the network
+        os._exit(1)
     except Exception as e:
         print(f"[!] Error: {e}", file=sys.stderr)
         sys.exit(1)